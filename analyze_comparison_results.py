@@ -1,307 +1,720 @@
-#!/usr/bin/env python3
-"""
-Analysis script for comparison results CSV files.
-
-This script analyzes comparison results and reports:
-- Statistics on identity fields
-- Date comparisons to identify outdated CCP4 files
-- Summary statistics
-"""
-
-import argparse
-import csv
-import sys
-from collections import defaultdict
-from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Tuple
-
-
-def parse_date(date_str: str) -> datetime:
-    """Parse date string in YYYY-MM-DD format."""
-    try:
-        return datetime.strptime(date_str, '%Y-%m-%d')
-    except (ValueError, TypeError):
-        return None
-
-
-def analyze_comparison_results(csv_file: str) -> Dict:
-    """Analyze comparison results CSV file.
-    
-    Args:
-        csv_file: Path to the comparison results CSV file
-        
-    Returns:
-        Dictionary containing analysis results
-    """
-    results = {
-        'total_entries': 0,
-        'identity_counts': defaultdict(int),
-        'overall_identical': {'Y': 0, 'N': 0},
-        'date_comparison': {
-            'ccp4_outdated': 0,
-            'ccp4_up_to_date': 0,
-            'dates_equal': 0,
-            'missing_dates': 0
-        },
-        'outdated_entries': []
-    }
-    
-    identity_fields = [
-        'name_identical', 'type_identical', 'atom_identical',
-        'bond_identical', 'descriptor_identical', 'overall_identical'
-    ]
-    
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            for row in reader:
-                results['total_entries'] += 1
-                ccd_code = row.get('ccd_code', '')
-                
-                # Count identity fields
-                for field in identity_fields:
-                    value = row.get(field, '').strip().upper()
-                    if value in ['Y', 'N']:
-                        results['identity_counts'][f'{field}_{value}'] += 1
-                
-                # Count overall identical
-                overall = row.get('overall_identical', '').strip().upper()
-                if overall in ['Y', 'N']:
-                    results['overall_identical'][overall] += 1
-                
-                # Compare dates
-                wwpdb_date_str = row.get('wwpdb_modified_date', '').strip()
-                ccp4_date_str = row.get('ccp4_modified_date', '').strip()
-                
-                if not wwpdb_date_str or not ccp4_date_str:
-                    results['date_comparison']['missing_dates'] += 1
-                    continue
-                
-                wwpdb_date = parse_date(wwpdb_date_str)
-                ccp4_date = parse_date(ccp4_date_str)
-                
-                if wwpdb_date is None or ccp4_date is None:
-                    results['date_comparison']['missing_dates'] += 1
-                    continue
-                
-                if ccp4_date < wwpdb_date:
-                    # CCP4 file is outdated
-                    results['date_comparison']['ccp4_outdated'] += 1
-                    results['outdated_entries'].append({
-                        'ccd_code': ccd_code,
-                        'wwpdb_date': wwpdb_date_str,
-                        'ccp4_date': ccp4_date_str,
-                        'days_behind': (wwpdb_date - ccp4_date).days,
-                        'overall_identical': row.get('overall_identical', '')
-                    })
-                elif ccp4_date > wwpdb_date:
-                    results['date_comparison']['ccp4_up_to_date'] += 1
-                else:
-                    results['date_comparison']['dates_equal'] += 1
-                    
-    except FileNotFoundError:
-        print(f"Error: File '{csv_file}' not found.", file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error reading file: {e}", file=sys.stderr)
-        sys.exit(1)
-    
-    # Sort outdated entries by days behind (most outdated first)
-    results['outdated_entries'].sort(key=lambda x: x['days_behind'], reverse=True)
-    
-    return results
-
-
-def print_report(results: Dict, output_file: str = None):
-    """Print analysis report.
-    
-    Args:
-        results: Analysis results dictionary
-        output_file: Optional file path to write report to
-    """
-    output_lines = []
-    
-    def add_line(text: str = ''):
-        output_lines.append(text)
-        print(text)
-    
-    add_line("=" * 80)
-    add_line("COMPARISON RESULTS ANALYSIS REPORT")
-    add_line("=" * 80)
-    add_line()
-    
-    # Summary statistics
-    add_line("SUMMARY STATISTICS")
-    add_line("-" * 80)
-    add_line(f"Total entries: {results['total_entries']:,}")
-    add_line()
-    
-    # Overall identical statistics
-    add_line("OVERALL IDENTITY")
-    add_line("-" * 80)
-    total_overall = sum(results['overall_identical'].values())
-    if total_overall > 0:
-        for status in ['Y', 'N']:
-            count = results['overall_identical'][status]
-            percentage = (count / total_overall) * 100
-            status_label = "Identical" if status == 'Y' else "Different"
-            add_line(f"  {status_label}: {count:,} ({percentage:.2f}%)")
-    add_line()
-    
-    # Field-by-field identity statistics
-    add_line("FIELD-BY-FIELD IDENTITY")
-    add_line("-" * 80)
-    fields = [
-        ('name_identical', 'Name'),
-        ('type_identical', 'Type'),
-        ('atom_identical', 'Atom'),
-        ('bond_identical', 'Bond'),
-        ('descriptor_identical', 'Descriptor')
-    ]
-    
-    for field_key, field_label in fields:
-        y_count = results['identity_counts'].get(f'{field_key}_Y', 0)
-        n_count = results['identity_counts'].get(f'{field_key}_N', 0)
-        total = y_count + n_count
-        if total > 0:
-            y_pct = (y_count / total) * 100
-            n_pct = (n_count / total) * 100
-            add_line(f"  {field_label:15s}: Identical={y_count:6,} ({y_pct:5.2f}%), "
-                    f"Different={n_count:6,} ({n_pct:5.2f}%)")
-    add_line()
-    
-    # Date comparison statistics
-    add_line("DATE COMPARISON (CCP4 vs WWPDB)")
-    add_line("-" * 80)
-    date_comp = results['date_comparison']
-    total_dated = (date_comp['ccp4_outdated'] + date_comp['ccp4_up_to_date'] + 
-                   date_comp['dates_equal'])
-    
-    if total_dated > 0:
-        outdated_pct = (date_comp['ccp4_outdated'] / total_dated) * 100
-        uptodate_pct = (date_comp['ccp4_up_to_date'] / total_dated) * 100
-        equal_pct = (date_comp['dates_equal'] / total_dated) * 100
-        
-        add_line(f"  CCP4 outdated (ccp4_date < wwpdb_date): "
-                f"{date_comp['ccp4_outdated']:,} ({outdated_pct:.2f}%)")
-        add_line(f"  CCP4 up-to-date (ccp4_date > wwpdb_date): "
-                f"{date_comp['ccp4_up_to_date']:,} ({uptodate_pct:.2f}%)")
-        add_line(f"  Dates equal: {date_comp['dates_equal']:,} ({equal_pct:.2f}%)")
-    
-    if date_comp['missing_dates'] > 0:
-        add_line(f"  Missing dates: {date_comp['missing_dates']:,}")
-    add_line()
-    
-    # Outdated entries
-    outdated = results['outdated_entries']
-    if outdated:
-        add_line("OUTDATED CCP4 FILES (ccp4_modified_date < wwpdb_modified_date)")
-        add_line("-" * 80)
-        add_line(f"Total outdated entries: {len(outdated):,}")
-        add_line()
-        
-        # Show top 20 most outdated
-        add_line("Top 20 most outdated entries:")
-        add_line(f"{'CCD Code':<12} {'WWPDB Date':<12} {'CCP4 Date':<12} "
-                f"{'Days Behind':<12} {'Overall Identical':<18}")
-        add_line("-" * 80)
-        
-        for entry in outdated[:20]:
-            add_line(f"{entry['ccd_code']:<12} {entry['wwpdb_date']:<12} "
-                    f"{entry['ccp4_date']:<12} {entry['days_behind']:<12,} "
-                    f"{entry['overall_identical']:<18}")
-        
-        if len(outdated) > 20:
-            add_line(f"\n... and {len(outdated) - 20:,} more outdated entries")
-        
-        # Statistics on outdated entries
-        if outdated:
-            days_behind = [e['days_behind'] for e in outdated]
-            avg_days = sum(days_behind) / len(days_behind)
-            max_days = max(days_behind)
-            min_days = min(days_behind)
-            
-            add_line()
-            add_line("Outdated entries statistics:")
-            add_line(f"  Average days behind: {avg_days:.1f}")
-            add_line(f"  Maximum days behind: {max_days:,}")
-            add_line(f"  Minimum days behind: {min_days:,}")
-            
-            # Count how many outdated entries are also different
-            outdated_different = sum(1 for e in outdated if e['overall_identical'] == 'N')
-            outdated_identical = len(outdated) - outdated_different
-            add_line()
-            add_line("Outdated entries by identity status:")
-            add_line(f"  Outdated and different: {outdated_different:,} "
-                    f"({(outdated_different/len(outdated)*100):.2f}%)")
-            add_line(f"  Outdated but identical: {outdated_identical:,} "
-                    f"({(outdated_identical/len(outdated)*100):.2f}%)")
-    else:
-        add_line("No outdated CCP4 files found.")
-    
-    add_line()
-    add_line("=" * 80)
-    
-    # Write to file
-    if output_file:
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(output_lines))
-            print(f"\nReport written to: {output_file}")
-        except Exception as e:
-            print(f"\nWarning: Could not write report to file: {e}", file=sys.stderr)
-
-
-def main():
-    """Main entry point."""
-    parser = argparse.ArgumentParser(
-        description='Analyze comparison results CSV file and generate statistics report.',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  python analyze_comparison_results.py comparison_results_20260107_215221.csv
-  python analyze_comparison_results.py comparison_results.csv -o custom_report.txt
-        """
-    )
-    
-    parser.add_argument(
-        'input_file',
-        type=str,
-        help='Path to the comparison results CSV file'
-    )
-    
-    parser.add_argument(
-        '-o', '--output',
-        type=str,
-        default=None,
-        help='Optional output file path for the report (default: auto-generate with timestamp)'
-    )
-    
-    args = parser.parse_args()
-    
-    # Check if input file exists
-    if not Path(args.input_file).exists():
-        print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
-        sys.exit(1)
-    
-    # Generate automatic output filename if not specified
-    if args.output is None:
-        input_path = Path(args.input_file)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        # Create output filename: analysis_report_<input_stem>_<timestamp>.txt
-        output_filename = f"analysis_report_{input_path.stem}_{timestamp}.txt"
-        args.output = output_filename
-    
-    # Analyze the file
-    print(f"Analyzing: {args.input_file}...", file=sys.stderr)
-    results = analyze_comparison_results(args.input_file)
-    
-    # Print report
-    print_report(results, args.output)
-
-
-if __name__ == '__main__':
-    main()
-
+#!/usr/bin/env python3
+"""
+Analysis script for comparison results CSV files.
+
+This script analyzes comparison results and reports:
+- Statistics on identity fields
+- Date comparisons to identify outdated CCP4 files
+- Summary statistics
+"""
+
+import argparse
+import csv
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache, partial
+from heapq import heappush, heapreplace, nlargest
+from io import StringIO
+from multiprocessing import Pool, cpu_count
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    from pandas import read_csv as pd_read_csv, to_datetime as pd_to_datetime
+    PANDAS_AVAILABLE = True
+except ImportError:
+    # Fallback to the pure-Python csv path if pandas is not installed
+    PANDAS_AVAILABLE = False
+
+try:
+    from pyarrow import csv as pa_csv, string as pa_string
+    PYARROW_AVAILABLE = True
+except ImportError:
+    # Fallback to the pandas CSV reader (or the pure-Python csv path)
+    PYARROW_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    # Fallback to per-row date comparison in the csv path
+    NUMPY_AVAILABLE = False
+
+
+# Shape prefilter for parse_date: rejecting malformed input with a regex is
+# far cheaper than raising and catching an exception
+_DATE_MATCH = re.compile(r'\d{4}-\d{2}-\d{2}').fullmatch
+
+
+@lru_cache(maxsize=None)
+def parse_date(date_str: str) -> datetime:
+    """Parse date string in YYYY-MM-DD format.
+
+    Memoized: CCD entries share a small pool of distinct modification dates,
+    so each unique date string is only parsed once per run.
+
+    The regex prefilter plus C-implemented fromisoformat replaces both
+    strptime's format-string machinery and the exception-based error path.
+    """
+    try:
+        if not _DATE_MATCH(date_str):
+            return None
+        return datetime.fromisoformat(date_str)
+    except (ValueError, TypeError):
+        return None
+
+
+IDENTITY_FIELDS = [
+    'name_identical', 'type_identical', 'atom_identical',
+    'bond_identical', 'descriptor_identical', 'overall_identical'
+]
+
+# Identity cells are almost always a bare 'Y' or 'N' already; fast-path
+# those so the strip/upper temporaries are only allocated for stragglers
+_YN_NORM = {'Y': 'Y', 'N': 'N', 'y': 'Y', 'n': 'N'}
+
+# Column index of each status in the fixed per-field count matrix
+_YN_COL = {'Y': 0, 'N': 1}
+
+
+def _norm_yn(value: str) -> str:
+    """Normalize an identity cell, fast-pathing the dominant Y/N values."""
+    fast = _YN_NORM.get(value)
+    return fast if fast is not None else value.strip().upper()
+
+
+def _empty_results() -> Dict:
+    """Create an empty results dictionary skeleton.
+
+    'outdated_entries' only ever holds the top-N most outdated entries
+    (sorted most-outdated first); 'outdated_stats' carries the exact
+    aggregates over ALL outdated rows, so the report's statistics stay
+    exact while memory for the entry list is bounded by N.
+    """
+    return {
+        'total_entries': 0,
+        'identity_counts': defaultdict(int),
+        'overall_identical': {'Y': 0, 'N': 0},
+        'date_comparison': {
+            'ccp4_outdated': 0,
+            'ccp4_up_to_date': 0,
+            'dates_equal': 0,
+            'missing_dates': 0
+        },
+        'outdated_entries': [],
+        'outdated_stats': {
+            'count': 0,
+            'sum_days': 0,
+            'max_days': 0,
+            'min_days': 0,
+            'different': 0
+        }
+    }
+
+
+# Rows per chunk in the chunked pandas path: large enough to amortize the
+# per-chunk kernel overhead, small enough to keep memory use constant
+CHUNK_ROWS = 200_000
+
+# Only spread chunks across worker processes for files big enough that the
+# compute outweighs the pool startup and chunk pickling costs
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+# How many of the most-outdated entries to keep and report by default
+TOP_N_DEFAULT = 20
+
+
+def _iter_dataframe_chunks(csv_file: str, needed_cols: set):
+    """Yield the needed CSV columns as string DataFrames, one chunk at a time.
+
+    Prefers pyarrow's multithreaded C++ CSV parser when available (parallel
+    tokenization makes it several times faster than the pandas reader on
+    large files), otherwise falls back to pandas' own chunked reader.
+    Streaming in chunks keeps memory constant for multi-GB files instead of
+    materializing the whole table. Missing columns are filled with empty
+    strings in both paths.
+    """
+    if PYARROW_AVAILABLE:
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=sorted(needed_cols),
+            include_missing_columns=True,
+            column_types={col: pa_string() for col in needed_cols})
+        with pa_csv.open_csv(csv_file, convert_options=convert_options) as reader:
+            for batch in reader:
+                yield batch.to_pandas().fillna('')
+        return
+
+    for df in pd_read_csv(csv_file, usecols=lambda c: c in needed_cols,
+                          dtype=str, keep_default_na=False,
+                          chunksize=CHUNK_ROWS):
+        # Ensure all expected columns exist (missing columns behave like empty values)
+        for col in needed_cols:
+            if col not in df.columns:
+                df[col] = ''
+        yield df
+
+
+def _analyze_chunk(df, top_n: int = TOP_N_DEFAULT) -> Dict:
+    """Analyze one DataFrame chunk and return its partial results."""
+    results = _empty_results()
+    results['total_entries'] = len(df)
+
+    # Count identity fields with vectorized value_counts
+    for field in IDENTITY_FIELDS:
+        counts = df[field].str.strip().str.upper().value_counts()
+        for status in ('Y', 'N'):
+            count = int(counts.get(status, 0))
+            if count:
+                results['identity_counts'][f'{field}_{status}'] = count
+
+    # Compare dates (vectorized)
+    wwpdb_str = df['wwpdb_modified_date'].str.strip()
+    ccp4_str = df['ccp4_modified_date'].str.strip()
+    wwpdb_date = pd_to_datetime(wwpdb_str, format='%Y-%m-%d', errors='coerce', cache=True)
+    ccp4_date = pd_to_datetime(ccp4_str, format='%Y-%m-%d', errors='coerce', cache=True)
+
+    missing = wwpdb_date.isna() | ccp4_date.isna()
+    valid = ~missing
+    outdated = valid & (ccp4_date < wwpdb_date)
+
+    date_comp = results['date_comparison']
+    date_comp['missing_dates'] = int(missing.sum())
+    date_comp['ccp4_outdated'] = int(outdated.sum())
+    date_comp['ccp4_up_to_date'] = int((valid & (ccp4_date > wwpdb_date)).sum())
+    date_comp['dates_equal'] = int((valid & (ccp4_date == wwpdb_date)).sum())
+
+    # Exact aggregates over every outdated row, but only the chunk's top-N
+    # entries are materialized as dicts
+    if date_comp['ccp4_outdated'] > 0:
+        days_behind = (wwpdb_date - ccp4_date).dt.days[outdated].astype(int)
+        stats = results['outdated_stats']
+        stats['count'] = len(days_behind)
+        stats['sum_days'] = int(days_behind.sum())
+        stats['max_days'] = int(days_behind.max())
+        stats['min_days'] = int(days_behind.min())
+        stats['different'] = int((df.loc[outdated, 'overall_identical'] == 'N').sum())
+
+        outdated_df = df.loc[outdated, ['ccd_code', 'overall_identical']].copy()
+        outdated_df['wwpdb_date'] = wwpdb_str[outdated]
+        outdated_df['ccp4_date'] = ccp4_str[outdated]
+        outdated_df['days_behind'] = days_behind
+        results['outdated_entries'] = outdated_df.nlargest(top_n, 'days_behind')[
+            ['ccd_code', 'wwpdb_date', 'ccp4_date', 'days_behind', 'overall_identical']
+        ].to_dict('records')
+
+    return results
+
+
+def _merge_partial(results: Dict, part: Dict, top_n: int = TOP_N_DEFAULT):
+    """Fold one chunk's partial results into the running totals."""
+    results['total_entries'] += part['total_entries']
+    for key, count in part['identity_counts'].items():
+        results['identity_counts'][key] += count
+    for key, count in part['date_comparison'].items():
+        results['date_comparison'][key] += count
+
+    part_stats = part['outdated_stats']
+    if part_stats['count']:
+        stats = results['outdated_stats']
+        if stats['count']:
+            stats['max_days'] = max(stats['max_days'], part_stats['max_days'])
+            stats['min_days'] = min(stats['min_days'], part_stats['min_days'])
+        else:
+            stats['max_days'] = part_stats['max_days']
+            stats['min_days'] = part_stats['min_days']
+        stats['count'] += part_stats['count']
+        stats['sum_days'] += part_stats['sum_days']
+        stats['different'] += part_stats['different']
+
+        combined = results['outdated_entries'] + part['outdated_entries']
+        if len(combined) > top_n:
+            combined = nlargest(top_n, combined, key=itemgetter('days_behind'))
+        results['outdated_entries'] = combined
+
+
+def _analyze_with_pandas(csv_file: str, top_n: int = TOP_N_DEFAULT) -> Dict:
+    """Analyze comparison results using vectorized pandas operations.
+
+    Much faster than the row-by-row csv path for large files: the CSV parse,
+    Y/N counting and date comparisons all run in C-level pandas kernels.
+    The file is processed in chunks so memory stays constant regardless of
+    file size; per-chunk counters and date buckets are simply summed.
+    Chunks are independent, so for large files they are dispatched to a
+    multiprocessing pool and the partial results merged in order.
+    """
+    results = _empty_results()
+
+    needed_cols = set(['ccd_code', 'wwpdb_modified_date', 'ccp4_modified_date'] + IDENTITY_FIELDS)
+    chunks = _iter_dataframe_chunks(csv_file, needed_cols)
+
+    if Path(csv_file).stat().st_size >= PARALLEL_MIN_BYTES:
+        num_workers = min(cpu_count(), 8)
+        with Pool(processes=num_workers) as pool:
+            for part in pool.imap(partial(_analyze_chunk, top_n=top_n), chunks):
+                _merge_partial(results, part, top_n)
+    else:
+        for df in chunks:
+            _merge_partial(results, _analyze_chunk(df, top_n), top_n)
+
+    # overall_identical is one of the identity fields counted above; derive
+    # its breakdown from those counts instead of normalizing the column again
+    for status in ('Y', 'N'):
+        results['overall_identical'][status] = \
+            results['identity_counts'].get(f'overall_identical_{status}', 0)
+
+    # Present the retained entries most-outdated first
+    results['outdated_entries'] = nlargest(top_n, results['outdated_entries'],
+                                           key=itemgetter('days_behind'))
+
+    return results
+
+
+def analyze_comparison_results(csv_file: str, top_n: int = TOP_N_DEFAULT) -> Dict:
+    """Analyze comparison results CSV file.
+
+    Uses vectorized pandas operations when pandas is available, otherwise
+    falls back to the pure-Python csv path.
+
+    Args:
+        csv_file: Path to the comparison results CSV file
+        top_n: How many of the most-outdated entries to retain for the report
+
+    Returns:
+        Dictionary containing analysis results
+    """
+    if PANDAS_AVAILABLE:
+        try:
+            return _analyze_with_pandas(csv_file, top_n)
+        except FileNotFoundError:
+            print(f"Error: File '{csv_file}' not found.", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"Error reading file: {e}", file=sys.stderr)
+            sys.exit(1)
+    return _analyze_with_csv(csv_file, top_n)
+
+
+def _analyze_with_csv(csv_file: str, top_n: int = TOP_N_DEFAULT) -> Dict:
+    """Analyze comparison results row-by-row with the csv module (no pandas)."""
+    results = _empty_results()
+
+    identity_fields = [
+        'name_identical', 'type_identical', 'atom_identical',
+        'bond_identical', 'descriptor_identical', 'overall_identical'
+    ]
+
+    # Rows with both dates present: (ccd_code, wwpdb_date_str, ccp4_date_str, overall)
+    date_rows = []
+
+    try:
+        # Read the whole file in one shot and tokenize from memory: one big
+        # read plus a single splitlines is cheaper than per-line buffered I/O
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        reader = csv.reader(lines)
+
+        # Precompute column indices once instead of letting DictReader
+        # build a fresh dict for every row
+        header = next(reader, None)
+        col_idx = {name: i for i, name in enumerate(header)} if header else {}
+        identity_idx = [(field, col_idx[field])
+                        for field in identity_fields if field in col_idx]
+        code_idx = col_idx.get('ccd_code')
+        wwpdb_idx = col_idx.get('wwpdb_modified_date')
+        ccp4_idx = col_idx.get('ccp4_modified_date')
+        overall_idx = col_idx.get('overall_identical')
+
+        # Materialize the parsed rows once; all column extraction below runs
+        # as C-level itemgetter maps instead of per-row Python loop bodies
+        rows = list(reader)
+        results['total_entries'] = len(rows)
+
+        if wwpdb_idx is not None and ccp4_idx is not None:
+            # The only remaining per-row Python work: strip the two date
+            # cells and route the row, with every hot name bound locally
+            missing_dates = 0
+            append_date_row = date_rows.append
+            code_get = itemgetter(code_idx) if code_idx is not None else None
+            overall_get = itemgetter(overall_idx) if overall_idx is not None else None
+            for row in rows:
+                wwpdb_date_str = row[wwpdb_idx].strip()
+                ccp4_date_str = row[ccp4_idx].strip()
+                if wwpdb_date_str and ccp4_date_str:
+                    append_date_row((code_get(row) if code_get else '',
+                                     wwpdb_date_str, ccp4_date_str,
+                                     overall_get(row) if overall_get else ''))
+                else:
+                    missing_dates += 1
+            results['date_comparison']['missing_dates'] += missing_dates
+        else:
+            results['date_comparison']['missing_dates'] += len(rows)
+
+    except FileNotFoundError:
+        print(f"Error: File '{csv_file}' not found.", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Tally each identity column with Counter over a C-level itemgetter map:
+    # strip/upper only touch the few distinct raw values, and the composite
+    # '<field>_<status>' keys are built once per field at the end
+    for field, i in identity_idx:
+        slot = [0, 0]
+        for raw_value, count in Counter(map(itemgetter(i), rows)).items():
+            col = _YN_COL.get(_norm_yn(raw_value))
+            if col is not None:
+                slot[col] += count
+        if slot[0]:
+            results['identity_counts'][f'{field}_Y'] += slot[0]
+        if slot[1]:
+            results['identity_counts'][f'{field}_N'] += slot[1]
+
+    # overall_identical was tallied with the other identity fields; derive
+    # its breakdown from those counts instead of tallying the column twice
+    for status in ('Y', 'N'):
+        results['overall_identical'][status] = \
+            results['identity_counts'].get(f'overall_identical_{status}', 0)
+
+    # Compare dates (vectorized if numpy is available); only the top-N most
+    # outdated entries are materialized, stats cover all outdated rows
+    if NUMPY_AVAILABLE:
+        _compare_dates_numpy(date_rows, results, top_n)
+    else:
+        _compare_dates_python(date_rows, results, top_n)
+
+    # Don't let the memoized dates leak across invocations
+    parse_date.cache_clear()
+
+    return results
+
+
+def _top_n_entries(heap: List[Tuple], date_rows: List[Tuple]) -> List[Dict]:
+    """Materialize heap items as entry dicts, most-outdated first."""
+    entries = []
+    for days, _neg_seq, i in sorted(heap, reverse=True):
+        ccd_code, wwpdb_date_str, ccp4_date_str, overall = date_rows[i]
+        entries.append({
+            'ccd_code': ccd_code,
+            'wwpdb_date': wwpdb_date_str,
+            'ccp4_date': ccp4_date_str,
+            'days_behind': days,
+            'overall_identical': overall
+        })
+    return entries
+
+
+def _compare_dates_numpy(date_rows: List[Tuple], results: Dict,
+                         top_n: int = TOP_N_DEFAULT):
+    """Compare date columns with vectorized numpy datetime64[D] arrays.
+
+    A single int64 subtraction replaces per-row datetime object comparisons;
+    only the top-N most outdated rows are converted back to Python objects,
+    using a bounded min-heap so memory stays O(N) even if millions of rows
+    are outdated. The aggregate stats are computed over the full subset.
+    """
+    if not date_rows:
+        return
+
+    wwpdb_strs = [r[1] for r in date_rows]
+    ccp4_strs = [r[2] for r in date_rows]
+
+    def to_datetime64(strs):
+        try:
+            return np.array(strs, dtype='datetime64[D]')
+        except ValueError:
+            # Some entries are malformed: pre-mask them to NaT
+            return np.array([s if parse_date(s) else 'NaT' for s in strs],
+                            dtype='datetime64[D]')
+
+    wwpdb_dates = to_datetime64(wwpdb_strs)
+    ccp4_dates = to_datetime64(ccp4_strs)
+
+    missing = np.isnat(wwpdb_dates) | np.isnat(ccp4_dates)
+    valid = ~missing
+    days_behind = (wwpdb_dates - ccp4_dates).astype('int64')
+    outdated = valid & (days_behind > 0)
+
+    date_comp = results['date_comparison']
+    date_comp['missing_dates'] += int(np.count_nonzero(missing))
+    date_comp['ccp4_outdated'] += int(np.count_nonzero(outdated))
+    date_comp['ccp4_up_to_date'] += int(np.count_nonzero(valid & (days_behind < 0)))
+    date_comp['dates_equal'] += int(np.count_nonzero(valid & (days_behind == 0)))
+
+    outdated_idx = np.nonzero(outdated)[0]
+    if not len(outdated_idx):
+        return
+    outdated_days = days_behind[outdated_idx]
+
+    stats = results['outdated_stats']
+    stats['count'] += len(outdated_idx)
+    stats['sum_days'] += int(outdated_days.sum())
+    stats['max_days'] = int(outdated_days.max())
+    stats['min_days'] = int(outdated_days.min())
+    stats['different'] += sum(1 for i in outdated_idx.tolist()
+                              if date_rows[i][3] == 'N')
+
+    # Bounded min-heap of the top-N; the -seq tiebreak keeps the earlier of
+    # two equally-outdated rows, matching a stable full sort
+    heap = []
+    for seq, (i, days) in enumerate(zip(outdated_idx.tolist(),
+                                        outdated_days.tolist())):
+        item = (days, -seq, i)
+        if len(heap) < top_n:
+            heappush(heap, item)
+        elif heap and item > heap[0]:
+            heapreplace(heap, item)
+
+    results['outdated_entries'] = _top_n_entries(heap, date_rows)
+
+
+def _compare_dates_python(date_rows: List[Tuple], results: Dict,
+                          top_n: int = TOP_N_DEFAULT):
+    """Compare date columns row-by-row with datetime objects (no numpy)."""
+    date_comp = results['date_comparison']
+    stats = results['outdated_stats']
+    heap = []
+    seq = 0
+
+    for i, (ccd_code, wwpdb_date_str, ccp4_date_str, overall) in enumerate(date_rows):
+        wwpdb_date = parse_date(wwpdb_date_str)
+        ccp4_date = parse_date(ccp4_date_str)
+
+        if wwpdb_date is None or ccp4_date is None:
+            date_comp['missing_dates'] += 1
+            continue
+
+        if ccp4_date < wwpdb_date:
+            # CCP4 file is outdated
+            date_comp['ccp4_outdated'] += 1
+            days = (wwpdb_date - ccp4_date).days
+            stats['count'] += 1
+            stats['sum_days'] += days
+            if stats['count'] == 1:
+                stats['max_days'] = days
+                stats['min_days'] = days
+            else:
+                if days > stats['max_days']:
+                    stats['max_days'] = days
+                if days < stats['min_days']:
+                    stats['min_days'] = days
+            if overall == 'N':
+                stats['different'] += 1
+
+            item = (days, -seq, i)
+            seq += 1
+            if len(heap) < top_n:
+                heappush(heap, item)
+            elif heap and item > heap[0]:
+                heapreplace(heap, item)
+        elif ccp4_date > wwpdb_date:
+            date_comp['ccp4_up_to_date'] += 1
+        else:
+            date_comp['dates_equal'] += 1
+
+    results['outdated_entries'] = _top_n_entries(heap, date_rows)
+
+
+def print_report(results: Dict, output_file: str = None):
+    """Print analysis report.
+    
+    Args:
+        results: Analysis results dictionary
+        output_file: Optional file path to write report to
+    """
+    # Build the report in a single buffer and emit it with one write at the
+    # end, instead of one print (flush cycle) per line plus a mirrored list
+    buf = StringIO()
+
+    def add_line(text: str = ''):
+        buf.write(text)
+        buf.write('\n')
+
+    add_line("=" * 80)
+    add_line("COMPARISON RESULTS ANALYSIS REPORT")
+    add_line("=" * 80)
+    add_line()
+    
+    # Summary statistics
+    add_line("SUMMARY STATISTICS")
+    add_line("-" * 80)
+    add_line(f"Total entries: {results['total_entries']:,}")
+    add_line()
+    
+    # Overall identical statistics
+    add_line("OVERALL IDENTITY")
+    add_line("-" * 80)
+    total_overall = sum(results['overall_identical'].values())
+    if total_overall > 0:
+        for status in ['Y', 'N']:
+            count = results['overall_identical'][status]
+            percentage = (count / total_overall) * 100
+            status_label = "Identical" if status == 'Y' else "Different"
+            add_line(f"  {status_label}: {count:,} ({percentage:.2f}%)")
+    add_line()
+    
+    # Field-by-field identity statistics
+    add_line("FIELD-BY-FIELD IDENTITY")
+    add_line("-" * 80)
+    fields = [
+        ('name_identical', 'Name'),
+        ('type_identical', 'Type'),
+        ('atom_identical', 'Atom'),
+        ('bond_identical', 'Bond'),
+        ('descriptor_identical', 'Descriptor')
+    ]
+    
+    for field_key, field_label in fields:
+        y_count = results['identity_counts'].get(f'{field_key}_Y', 0)
+        n_count = results['identity_counts'].get(f'{field_key}_N', 0)
+        total = y_count + n_count
+        if total > 0:
+            y_pct = (y_count / total) * 100
+            n_pct = (n_count / total) * 100
+            add_line(f"  {field_label:15s}: Identical={y_count:6,} ({y_pct:5.2f}%), "
+                    f"Different={n_count:6,} ({n_pct:5.2f}%)")
+    add_line()
+    
+    # Date comparison statistics
+    add_line("DATE COMPARISON (CCP4 vs WWPDB)")
+    add_line("-" * 80)
+    date_comp = results['date_comparison']
+    total_dated = (date_comp['ccp4_outdated'] + date_comp['ccp4_up_to_date'] + 
+                   date_comp['dates_equal'])
+    
+    if total_dated > 0:
+        outdated_pct = (date_comp['ccp4_outdated'] / total_dated) * 100
+        uptodate_pct = (date_comp['ccp4_up_to_date'] / total_dated) * 100
+        equal_pct = (date_comp['dates_equal'] / total_dated) * 100
+        
+        add_line(f"  CCP4 outdated (ccp4_date < wwpdb_date): "
+                f"{date_comp['ccp4_outdated']:,} ({outdated_pct:.2f}%)")
+        add_line(f"  CCP4 up-to-date (ccp4_date > wwpdb_date): "
+                f"{date_comp['ccp4_up_to_date']:,} ({uptodate_pct:.2f}%)")
+        add_line(f"  Dates equal: {date_comp['dates_equal']:,} ({equal_pct:.2f}%)")
+    
+    if date_comp['missing_dates'] > 0:
+        add_line(f"  Missing dates: {date_comp['missing_dates']:,}")
+    add_line()
+    
+    # Outdated entries: the analysis retains only the top-N (already sorted
+    # most-outdated first) plus exact aggregates over all outdated rows
+    top_outdated = results['outdated_entries']
+    stats = results['outdated_stats']
+    total_outdated = stats['count']
+    if total_outdated:
+        add_line("OUTDATED CCP4 FILES (ccp4_modified_date < wwpdb_modified_date)")
+        add_line("-" * 80)
+        add_line(f"Total outdated entries: {total_outdated:,}")
+        add_line()
+
+        add_line(f"Top {len(top_outdated)} most outdated entries:")
+        add_line(f"{'CCD Code':<12} {'WWPDB Date':<12} {'CCP4 Date':<12} "
+                f"{'Days Behind':<12} {'Overall Identical':<18}")
+        add_line("-" * 80)
+
+        for entry in top_outdated:
+            add_line(f"{entry['ccd_code']:<12} {entry['wwpdb_date']:<12} "
+                    f"{entry['ccp4_date']:<12} {entry['days_behind']:<12,} "
+                    f"{entry['overall_identical']:<18}")
+
+        if total_outdated > len(top_outdated):
+            add_line(f"\n... and {total_outdated - len(top_outdated):,} more outdated entries")
+
+        # Statistics on outdated entries (exact, independent of top-N)
+        avg_days = stats['sum_days'] / total_outdated
+        outdated_different = stats['different']
+        outdated_identical = total_outdated - outdated_different
+
+        add_line()
+        add_line("Outdated entries statistics:")
+        add_line(f"  Average days behind: {avg_days:.1f}")
+        add_line(f"  Maximum days behind: {stats['max_days']:,}")
+        add_line(f"  Minimum days behind: {stats['min_days']:,}")
+
+        add_line()
+        add_line("Outdated entries by identity status:")
+        add_line(f"  Outdated and different: {outdated_different:,} "
+                f"({(outdated_different/total_outdated*100):.2f}%)")
+        add_line(f"  Outdated but identical: {outdated_identical:,} "
+                f"({(outdated_identical/total_outdated*100):.2f}%)")
+    else:
+        add_line("No outdated CCP4 files found.")
+    
+    add_line()
+    add_line("=" * 80)
+    
+    report = buf.getvalue()
+    sys.stdout.write(report)
+
+    # Write to file
+    if output_file:
+        try:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(report)
+            print(f"\nReport written to: {output_file}")
+        except Exception as e:
+            print(f"\nWarning: Could not write report to file: {e}", file=sys.stderr)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Analyze comparison results CSV file and generate statistics report.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python analyze_comparison_results.py comparison_results_20260107_215221.csv
+  python analyze_comparison_results.py comparison_results.csv -o custom_report.txt
+        """
+    )
+    
+    parser.add_argument(
+        'input_file',
+        type=str,
+        help='Path to the comparison results CSV file'
+    )
+    
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        default=None,
+        help='Optional output file path for the report (default: auto-generate with timestamp)'
+    )
+
+    parser.add_argument(
+        '--top-n',
+        type=int,
+        default=TOP_N_DEFAULT,
+        help=f'Number of most-outdated entries to list in the report (default: {TOP_N_DEFAULT})'
+    )
+    
+    args = parser.parse_args()
+    
+    # Check if input file exists
+    if not Path(args.input_file).exists():
+        print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+    
+    # Generate automatic output filename if not specified
+    if args.output is None:
+        input_path = Path(args.input_file)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Create output filename: analysis_report_<input_stem>_<timestamp>.txt
+        output_filename = f"analysis_report_{input_path.stem}_{timestamp}.txt"
+        args.output = output_filename
+    
+    # Analyze the file
+    print(f"Analyzing: {args.input_file}...", file=sys.stderr)
+    results = analyze_comparison_results(args.input_file, top_n=args.top_n)
+    
+    # Print report
+    print_report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
+